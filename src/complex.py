@@ -1,97 +1,247 @@
 from __future__ import annotations
 from typing import List, Dict, Set, FrozenSet, Callable
-from itertools import combinations
+from collections import defaultdict
+from itertools import chain
+from dataclasses import dataclass, field
 
 from union_find import UnionFind
+from interner import vertex_id, vertex_name
 
 type VertexName = str
 type Simplex = FrozenSet[VertexName]
 
+@dataclass(frozen=True, slots=True)
 class Complex:
-    """A simplicial complex represented by its maximal simplices and a union-find structure for vertex identifications."""
-    maximal_simplices : Set[Simplex]
-    uf: UnionFind[VertexName]
+    """A simplicial complex represented by its maximal simplices and a union-find structure for vertex identifications.
+
+    A Complex is value-like: it is frozen and slotted, never mutated after
+    construction (the operations below always build new instances), so
+    derived data such as the vertex set, the dimension and the face set are
+    computed once and cached. Equality and the (cached) hash are defined by
+    the maximal simplices, which makes a Complex usable as a dict key for
+    memoizing observables.
+    """
+    maximal_simplices: FrozenSet[Simplex]
+    uf: UnionFind[VertexName] = field(compare=False)
+    _vertices: FrozenSet[VertexName] = field(init=False, repr=False, compare=False)
+    _dimension: int = field(init=False, repr=False, compare=False)
+    _simplices: Set[Simplex] | None = field(init=False, repr=False, compare=False, default=None)
+    _skeleton: Dict[int, List[Simplex]] | None = field(init=False, repr=False, compare=False, default=None)
+    _ordered: Dict[Simplex, tuple] | None = field(init=False, repr=False, compare=False, default=None)
+    _vertex_order: Dict[VertexName, int] | None = field(init=False, repr=False, compare=False, default=None)
+    _hash: int | None = field(init=False, repr=False, compare=False, default=None)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "maximal_simplices", frozenset(self.maximal_simplices))
+        if self.uf is None:
+            object.__setattr__(self, "uf", UnionFind[VertexName]())
+
+        object.__setattr__(self, "_vertices", frozenset().union(*self.maximal_simplices))
+        object.__setattr__(
+            self, "_dimension", max((len(face) - 1 for face in self.maximal_simplices), default=-1)
+        )
 
     @property
     def dimension(self) -> int:
-        if not self.maximal_simplices:
-            return -1
-        return max(len(face) - 1 for face in self.maximal_simplices)
+        return self._dimension
 
     @property
-    def vertices(self) -> Set[VertexName]:
-        verts: Set[VertexName] = set()
-        for face in self.maximal_simplices:
-            verts.update(face)
-        return verts
-    
-    def __init__(self, maximal_simplices: Set[Simplex], uf: UnionFind[VertexName]) -> None:
-        self.maximal_simplices = maximal_simplices
-        self.uf = uf or UnionFind[VertexName]()
+    def vertices(self) -> FrozenSet[VertexName]:
+        return self._vertices
 
     @property
     def classes(self) -> Dict[VertexName, Set[VertexName]]:
         return self.uf.get_classes()
-    
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.maximal_simplices))
+        return self._hash
+
     def __repr__(self) -> str:
         return (
         f"Complex(\n"
         f"  dimension={self.dimension},\n"
-        f"  maximal_simplices={self.maximal_simplices},\n"
+        f"  maximal_simplices={set(self.maximal_simplices)},\n"
         f"  classes={{ {self.classes} }}\n"
         f")"
         )
-    
+
     @property
     def simplices(self) -> Set[Simplex]:
-        """Returns all faces of the complex."""
-        simplices : Set[Simplex] = set()
-        for simplex in self.maximal_simplices:
-            n = len(simplex)
-            for k in range(1, n + 1):
-                for face in combinations(simplex, k):
-                    simplices.add(frozenset(face))
-        return simplices
-    
+        """Returns all faces of the complex.
+
+        The face set is built incrementally, facet by facet: each facet only
+        contributes the subsets not already produced by a previous facet.
+        Faces are enumerated as interned-id bitmasks with the classic
+        `sub = (sub - 1) & mask` submask walk, so deduplication hashes
+        small ints and a frozenset is allocated only once per distinct
+        face. The result is cached: a Complex is never mutated after
+        construction, so the cache needs no invalidation.
+        """
+        if self._simplices is None:
+            seen: Set[int] = set()
+            simplices: Set[Simplex] = set()
+            for simplex in self.maximal_simplices:
+                mask = _vertex_mask(simplex)
+                sub = mask
+                while sub:
+                    if sub not in seen:
+                        seen.add(sub)
+                        simplices.add(_mask_to_simplex(sub))
+                    sub = (sub - 1) & mask
+            object.__setattr__(self, "_simplices", simplices)
+        return self._simplices
+
+    @property
+    def skeleton(self) -> Dict[int, List[Simplex]]:
+        """Returns the faces grouped by dimension, cached.
+
+        The homology code asks for the k-simplices of the same complex
+        once per degree and matrix; grouping the face set once here turns
+        each of those calls into a dict lookup.
+        """
+        if self._skeleton is None:
+            skeleton: Dict[int, List[Simplex]] = defaultdict(list)
+            for simplex in self.simplices:
+                skeleton[len(simplex) - 1].append(simplex)
+            object.__setattr__(self, "_skeleton", dict(skeleton))
+        return self._skeleton
+
+    @property
+    def ordered_simplices(self) -> Dict[Simplex, tuple]:
+        """Returns each face as a tuple sorted by vertex_order, cached.
+
+        Boundary-matrix construction needs a canonical vertex ordering per
+        simplex; sorting every face once here replaces a lambda-keyed sort
+        per simplex per matrix with a dict lookup.
+        """
+        if self._ordered is None:
+            order = self.vertex_order
+            object.__setattr__(
+                self,
+                "_ordered",
+                {s: tuple(sorted(s, key=order.__getitem__)) for s in self.simplices},
+            )
+        return self._ordered
+
     @property
     def vertex_order(self) -> Dict[str, int]:
-        """Returns the list of vertices in a consistent order."""
-        return {v: i for i, v in enumerate(self.vertices)}
+        """Returns the list of vertices in a consistent order.
+
+        Built once and cached: the boundary-matrix code looks this up for
+        every simplex it orders.
+        """
+        if self._vertex_order is None:
+            object.__setattr__(self, "_vertex_order", {v: i for i, v in enumerate(self.vertices)})
+        return self._vertex_order
     
     
-# == OPERATIONS == #
-def union(K1: Complex, K2: Complex) -> Complex:
-    """Returns the union of two simplicial complex"""
-    common_vertices = set(K1.vertices) & set(K2.vertices)
+# == Mask helpers == #
+# Simplices travel through the operations below as integer bitmasks over the
+# process-wide vertex ids from interner.py; see that module for the rationale.
+def _canonical_ids(vertices: Set[VertexName], find: Callable[[VertexName], VertexName]) -> Dict[VertexName, int]:
+    """Precomputed vertex -> id-of-canonical-representative table.
+
+    Once an operation has merged its inputs the union-find no longer
+    changes, so each vertex's root is resolved exactly once here and the
+    canonicalization loops below do plain dict lookups instead of a find
+    call per (simplex, vertex) pair.
+    """
+    return {v: vertex_id(find(v)) for v in vertices}
+
+def _canonical_mask(simplex: Simplex, canon_id: Dict[VertexName, int]) -> int:
+    """Bitmask of the canonical representatives of a simplex's vertices."""
+    mask = 0
+    for v in simplex:
+        mask |= 1 << canon_id[v]
+    return mask
+
+def _vertex_mask(simplex: Simplex) -> int:
+    """Bitmask of a simplex's vertices under their own (uncanonicalized) ids."""
+    mask = 0
+    for v in simplex:
+        mask |= 1 << vertex_id(v)
+    return mask
+
+def _maximal_masks(masks: Set[int]) -> Set[int]:
+    """Discards masks contained in another mask, keeping only maximal ones.
+
+    Identifications can nest facets that were incomparable before (e.g.
+    gluing an edge onto the edge of a triangle), and a nested facet must
+    not be listed as maximal. Candidates are only the facet images
+    themselves — never their faces — and containment is a two-int
+    `a & b == a` check, ordered largest-first so each mask is compared
+    against kept (hence maximal) ones only.
+    """
+    kept: List[int] = []
+    for m in sorted(masks, key=int.bit_count, reverse=True):
+        if not any(m & k == m for k in kept):
+            kept.append(m)
+    return set(kept)
 
-    for v in common_vertices:
-        for w in common_vertices:
-            k1_eq = (K1.uf.find(v) == K1.uf.find(w))
-            k2_eq = (K2.uf.find(v) == K2.uf.find(w))
+def _mask_to_simplex(mask: int) -> Simplex:
+    names = []
+    while mask:
+        bit = mask & -mask
+        names.append(vertex_name(bit.bit_length() - 1))
+        mask ^= bit
+    return frozenset(names)
 
-            if k1_eq != k2_eq:
-                raise ValueError(
-                    f"Incompatible vertex identifications in union(): "
-                    f"{v} and {w} are equivalent in one complex but not the other."
-                )
-            
-    new_uf = K1.uf.merge(K2.uf)
-
-    new_simplices = set()
 
-    for s in K1.maximal_simplices | K2.maximal_simplices:
+# == OPERATIONS == #
+def union(K1: Complex, K2: Complex) -> Complex:
+    """Returns the union of two simplicial complex"""
+    common_vertices = K1.vertices & K2.vertices
 
-        canon = frozenset(new_uf.find(v) for v in s)
+    # The identifications agree iff, restricted to the common vertices, the
+    # two partitions coincide: the K1-class of a vertex must determine its
+    # K2-class and vice versa. Checking this class by class needs one find
+    # per vertex per side instead of a find per pair.
+    sig1 = {v: K1.uf.find(v) for v in common_vertices}
+    sig2 = {v: K2.uf.find(v) for v in common_vertices}
 
-        if len(canon) != len(s):
+    first_in_class1: Dict[VertexName, VertexName] = {}
+    first_in_class2: Dict[VertexName, VertexName] = {}
+    for v in common_vertices:
+        w = first_in_class1.setdefault(sig1[v], v)
+        if sig2[w] != sig2[v]:
             raise ValueError(
-                f"Union created a degenerate simplex: {s} collapsed to {canon} "
-                f"because some vertices became identified."
+                f"Incompatible vertex identifications in union(): "
+                f"{v} and {w} are equivalent in one complex but not the other."
             )
+        w = first_in_class2.setdefault(sig2[v], v)
+        if sig1[w] != sig1[v]:
+            raise ValueError(
+                f"Incompatible vertex identifications in union(): "
+                f"{v} and {w} are equivalent in one complex but not the other."
+            )
+
+    new_uf = K1.uf.merge(K2.uf)
+    new_uf.flatten()
+    canon_id = _canonical_ids(K1.vertices | K2.vertices, new_uf.find)
+
+    # Canonicalize in one comprehension, then validate and dedup; the loops
+    # run at the C level instead of one bytecode-dispatched add per facet.
+    canonical = [(s, _canonical_mask(s, canon_id)) for s in chain(K1.maximal_simplices, K2.maximal_simplices)]
+
+    collapsed = next((c for c in canonical if c[1].bit_count() != len(c[0])), None)
+    if collapsed is not None:
+        s, mask = collapsed
+        raise ValueError(
+            f"Union created a degenerate simplex: {s} collapsed to {_mask_to_simplex(mask)} "
+            f"because some vertices became identified."
+        )
 
-        new_simplices.add(canon)
+    new_masks = {mask for _, mask in canonical}
+    # Facets from disjoint complexes cannot nest in each other, so the
+    # inputs' antichains survive untouched and the maximality pass can be
+    # skipped; with shared vertices one input's facet may sit inside the
+    # other's (or inside a newly identified one).
+    if common_vertices:
+        new_masks = _maximal_masks(new_masks)
 
-    return Complex(maximal_simplices=new_simplices, uf=new_uf)
+    return Complex(maximal_simplices={_mask_to_simplex(m) for m in new_masks}, uf=new_uf)
 
 def glue(K1: Complex, K2: Complex, mapping: Dict[VertexName, VertexName]) -> Complex:
     """
@@ -119,9 +269,12 @@ def glue(K1: Complex, K2: Complex, mapping: Dict[VertexName, VertexName]) -> Com
 
     new_uf = K1.uf.merge(K2.uf)
 
+    k1_classes = K1.uf.get_classes()
+    k2_classes = K2.uf.get_classes()
+
     for ra, rb in rep_map.items():
-        class_a = K1.uf.get_classes()[ra]
-        class_b = K2.uf.get_classes()[rb]
+        class_a = k1_classes[ra]
+        class_b = k2_classes[rb]
 
         new_uf.union(ra, rb)
 
@@ -130,34 +283,49 @@ def glue(K1: Complex, K2: Complex, mapping: Dict[VertexName, VertexName]) -> Com
         for y in class_b:
             new_uf.union(ra, y)
 
-    new_simplices = set()
-    for s in K1.maximal_simplices | K2.maximal_simplices:
-        canon = frozenset(new_uf.find(v) for v in s)
-        if len(canon) != len(s):
-            raise ValueError(
-                f"glue(): simplex {s} collapsed to {canon} after vertex identifications."
-            )
-        new_simplices.add(canon)
+    new_uf.flatten()
+    canon_id = _canonical_ids(K1.vertices | K2.vertices, new_uf.find)
+
+    canonical = [(s, _canonical_mask(s, canon_id)) for s in chain(K1.maximal_simplices, K2.maximal_simplices)]
+
+    collapsed = next((c for c in canonical if c[1].bit_count() != len(c[0])), None)
+    if collapsed is not None:
+        s, mask = collapsed
+        raise ValueError(
+            f"glue(): simplex {s} collapsed to {_mask_to_simplex(mask)} after vertex identifications."
+        )
 
-    return Complex(maximal_simplices=new_simplices, uf=new_uf)
+    new_masks = _maximal_masks({mask for _, mask in canonical})
+
+    return Complex(maximal_simplices={_mask_to_simplex(m) for m in new_masks}, uf=new_uf)
 
 
 
 def join(K1: Complex, K2: Complex) -> Complex:
     """Returns the join of two simplicial complexes."""
     new_uf = K1.uf.merge(K2.uf)
-
-    new_simplices: Set[Simplex] = set()
-    for s in K1.maximal_simplices:
-        for t in K2.maximal_simplices:
-            canon = frozenset(new_uf.find(v) for v in s | t)
-            if len(canon) != len(s | t):
+    new_uf.flatten()
+    canon_id = _canonical_ids(K1.vertices | K2.vertices, new_uf.find)
+
+    # Masks are built once per facet per side; each of the |K1|*|K2| pairs
+    # is then two int ORs and two popcounts. The raw-id masks give |s U t|
+    # without allocating the union frozenset.
+    facets1 = [(s, _vertex_mask(s), _canonical_mask(s, canon_id)) for s in K1.maximal_simplices]
+    facets2 = [(t, _vertex_mask(t), _canonical_mask(t, canon_id)) for t in K2.maximal_simplices]
+
+    new_masks: Set[int] = set()
+    for s, raw_s, canon_s in facets1:
+        for t, raw_t, canon_t in facets2:
+            mask = canon_s | canon_t
+            if mask.bit_count() != (raw_s | raw_t).bit_count():
                 raise ValueError(
-                    f"Join created degenerate simplex: {s | t} collapsed to {canon}"
+                    f"Join created degenerate simplex: {s | t} collapsed to {_mask_to_simplex(mask)}"
                 )
-            new_simplices.add(canon)
+            new_masks.add(mask)
+
+    new_masks = _maximal_masks(new_masks)
 
-    return Complex(maximal_simplices=new_simplices, uf=new_uf)
+    return Complex(maximal_simplices={_mask_to_simplex(m) for m in new_masks}, uf=new_uf)
 
 def dimension(K: Complex) -> int:
     return K.dimension
@@ -174,9 +342,16 @@ def pick_vertex(C: Complex, state) -> Complex:
     """Picks a vertex from the complex according to insertion order."""
     if not C.vertices:
         raise ValueError("Cannot pick a vertex from an empty complex")
-    
-    # pick vertex to insertion order
-    v = max(C.vertices, key=lambda x: state.vertices_order.get(x, float('inf')))
+
+    # pick vertex to insertion order: vertices unknown to the state come
+    # first, otherwise walk the insertion-ordered dict backwards and stop at
+    # the first vertex of C, i.e. the most recently declared one
+    verts = C.vertices
+    missing = verts - state.vertices_order.keys()
+    if missing:
+        v = next(iter(missing))
+    else:
+        v = next(w for w in reversed(state.vertices_order) if w in verts)
     
     new_uf = UnionFind[VertexName]()
     new_uf.add(v)
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import Any, List, Dict,  Callable, Tuple, Type
+from typing import Any, List, Dict,  Callable, MutableMapping, NamedTuple, Tuple, Type
 from dataclasses import dataclass
+from collections import ChainMap
 
 from abc import ABC, abstractmethod
 
@@ -8,11 +9,10 @@ from parser import FunctionDecl, VertexDecl, parse_ast, Command, Expr, Program,
 from complex import Complex, VertexName, pick_vertex
 from union_find import UnionFind
 
-@dataclass
-class Loc:
+class Loc(NamedTuple):
     addr: int
 
-@dataclass
+@dataclass(slots=True)
 class Closure:
     function: FunctionDecl
     env: Environment
@@ -21,15 +21,18 @@ type EVal = Complex | int | bool | Closure
 type MVal = Complex
 type DVal = EVal | Loc | Operator | int | VertexName | Closure
 
-type Environment = Dict[str, DVal]
+type Environment = MutableMapping[str, DVal]
 
 # == State Management == #
-@dataclass
+@dataclass(slots=True)
 class State:
     store: Dict[int, MVal]
     next_loc: int
     vertices_order: Dict[VertexName, int]
-    new_vertex_id: int 
+    new_vertex_id: int
+    # Iteration cap for while-commands; tune (or raise) per State when a
+    # program legitimately needs longer-running loops.
+    max_iterations: int = 10_000_000
 
 def empty_store() -> Dict[int, MVal]:
     return {}
@@ -42,18 +45,23 @@ def empty_state() -> State:
         new_vertex_id=0
         )
 
+# States are threaded linearly through command execution and no caller keeps
+# an old State around, so the mutators below update the state in place and
+# return it instead of copying the whole store/order dict per command. Block
+# scoping in if-commands only ever restored next_loc, which stays a plain
+# field assignment.
+
 def allocate(state: State, value: MVal) -> tuple[Loc, State]:
     """Allocates a new location in the store and assigns it the given value."""
     loc = Loc(state.next_loc)
-    prev_store = state.store.copy()
-    prev_store[loc.addr] = value
-    return loc, State(store=prev_store, next_loc=state.next_loc + 1, vertices_order=state.vertices_order, new_vertex_id=state.new_vertex_id)
+    state.store[loc.addr] = value
+    state.next_loc += 1
+    return loc, state
 
 def update(state: State, addr: int, value: MVal) -> State:
     """Updates the value at the given location in the store."""
-    prev_store = state.store.copy()
-    prev_store[addr] = value
-    return State(store=prev_store, next_loc=state.next_loc, vertices_order=state.vertices_order, new_vertex_id=state.new_vertex_id)
+    state.store[addr] = value
+    return state
 
 def access(state: State, loc: Loc) -> MVal:
     """Accesses the value at the given location in the store."""
@@ -63,7 +71,7 @@ def access(state: State, loc: Loc) -> MVal:
 
 def ensure_vertices_order(state: State, vertices: set[VertexName]) -> State:
     """Ensures that all vertices in the given set have an order in the state's vertices_order."""
-    vo = state.vertices_order.copy()
+    vo = state.vertices_order
     next_index = len(vo)
 
     for v in vertices:
@@ -71,35 +79,18 @@ def ensure_vertices_order(state: State, vertices: set[VertexName]) -> State:
             vo[v] = next_index
             next_index += 1
 
-    return State(
-        store=state.store,
-        next_loc=state.next_loc,
-        vertices_order=vo,
-        new_vertex_id=state.new_vertex_id
-    )
+    return state
 
 def fresh_vertex(state: State, env: Environment) -> tuple[VertexName, State]:
     """Generates a fresh vertex name not already in the state's vertices_order.
         If the generated name exists, increments new_vertex_id and return the already existing vertex."""
     candidate : VertexName = f"__v{state.new_vertex_id}"
+    state.new_vertex_id += 1
 
-    if candidate in state.vertices_order:
-        return candidate, State(
-            store=state.store,
-            next_loc=state.next_loc,
-            vertices_order=state.vertices_order,
-            new_vertex_id=state.new_vertex_id + 1
-        )
+    if candidate not in state.vertices_order:
+        state.vertices_order[candidate] = len(state.vertices_order)
 
-    new_vertices_order = state.vertices_order.copy()
-    new_vertices_order[candidate] = len(new_vertices_order)   # 
-
-    return candidate, State(
-        store=state.store,
-        next_loc=state.next_loc,
-        vertices_order=new_vertices_order,
-        new_vertex_id=state.new_vertex_id + 1
-    )
+    return candidate, state
 
 # == Environment Management == #
 
@@ -116,7 +107,7 @@ def lookup(env: Environment, name: str) -> DVal:
         return env[name]
     raise KeyError(f"Identifier '{name}' not found in environment")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Operator(ABC):
     name: str
     fn: Callable
@@ -273,79 +264,90 @@ def initial_env_state() -> tuple[Environment, State]:
 # == EVALUATION == #
 from parser import ComplexLiteral, OpCall, FunCall
 
-def evaluate_expr(expr: Expr, env: Environment, state: State) -> EVal:
-    """Evaluates an expression in the given environment and state."""
+def _eval_identifier(expr: str, env: Environment, state: State) -> EVal:
+    dval = lookup(env, expr)
 
-    # Identifier
-    if isinstance(expr, str):
-        dval = lookup(env, expr)
+    if isinstance(dval, Loc):
+        val = access(state, dval)
+        if not isinstance(val, Complex):
+            raise ValueError(f"{expr} is not a complex")
+        return val
 
-        if isinstance(dval, Loc):
-            val = access(state, dval)
-            if not isinstance(val, Complex):
-                raise ValueError(f"{expr} is not a complex")
-            return val
-    
-        if isinstance(dval, (Complex, int, Closure)):
-            return dval
+    if isinstance(dval, (Complex, int, Closure)):
+        return dval
 
-        if isinstance(dval, str):
-            uf = UnionFind[VertexName]()
-            uf.add(dval)
-            return Complex({frozenset({dval})}, uf)
+    if isinstance(dval, str):
+        uf = UnionFind[VertexName]()
+        uf.add(dval)
+        return Complex({frozenset({dval})}, uf)
 
-        raise ValueError(f"Identifier '{expr}' is not a value")
-    
-    # Complex Literal
-    if isinstance(expr, ComplexLiteral):
-        simplex = frozenset(expr.vertices)
+    raise ValueError(f"Identifier '{expr}' is not a value")
 
-        uf = UnionFind[VertexName]()
-        for v in expr.vertices:
-            uf.add(v)
+def _eval_complex_literal(expr: ComplexLiteral, env: Environment, state: State) -> EVal:
+    simplex = frozenset(expr.vertices)
 
-        return Complex({simplex}, uf)
-    
-    # Integer Literal
-    if isinstance(expr, IntLiteral):
-        return expr.value
-    
-    # Operator Call Expression
-    if isinstance(expr, OpCall):
-        op = lookup(env, expr.op)
+    if len(simplex) != len(expr.vertices):
+        dupes = {v for v in simplex if expr.vertices.count(v) > 1}
+        raise ValueError(f"Complex literal lists duplicate vertices: {sorted(dupes)}")
 
-        if not isinstance(op, Operator):
-            raise ValueError(f"{expr.op} is not an operator")
+    uf = UnionFind[VertexName]()
+    for v in expr.vertices:
+        uf.add(v)
 
-        arg_vals = [evaluate_expr(a, env, state) for a in expr.args]
+    return Complex({simplex}, uf)
 
-        return op.apply(arg_vals, mapping=expr.mapping, state=state)
+def _eval_int_literal(expr: IntLiteral, env: Environment, state: State) -> EVal:
+    return expr.value
 
-    # Function Call Expression
-    if isinstance(expr, FunCall):
-        dval = lookup(env, expr.name)
-        if not isinstance(dval, Closure):
-            raise ValueError(f"{expr.name} is not a function")
+def _eval_op_call(expr: OpCall, env: Environment, state: State) -> EVal:
+    op = lookup(env, expr.op)
 
-        closure: Closure = dval
-        params = closure.function.params
-        args = expr.args
+    if not isinstance(op, Operator):
+        raise ValueError(f"{expr.op} is not an operator")
 
-        if len(args) != len(params):
-            raise ValueError(
-                f"Function {expr.name} expects {len(params)} args, got {len(args)}"
-            )
+    arg_vals = [evaluate_expr(a, env, state) for a in expr.args]
 
-        arg_vals = [evaluate_expr(a, env, state) for a in args]
+    return op.apply(arg_vals, mapping=expr.mapping, state=state)
 
-        call_env = closure.env
+def _eval_fun_call(expr: FunCall, env: Environment, state: State) -> EVal:
+    dval = lookup(env, expr.name)
+    if not isinstance(dval, Closure):
+        raise ValueError(f"{expr.name} is not a function")
 
-        for p, v in zip(params, arg_vals):
-            call_env = bind(call_env, p, v)
+    closure: Closure = dval
+    params = closure.function.params
+    args = expr.args
 
-        return evaluate_expr(closure.function.body, call_env, state)
-        
-    raise TypeError(f"Unknown expression type: {expr}")
+    if len(args) != len(params):
+        raise ValueError(
+            f"Function {expr.name} expects {len(params)} args, got {len(args)}"
+        )
+
+    arg_vals = [evaluate_expr(a, env, state) for a in args]
+
+    # One child scope layered over the closure environment: a single
+    # dict allocation for all parameters, with lookups falling through
+    # to the captured environment.
+    call_env = ChainMap(dict(zip(params, arg_vals)), closure.env)
+
+    return evaluate_expr(closure.function.body, call_env, state)
+
+# Expression nodes are plain types (identifiers are bare strings), so a
+# single dict lookup on type(expr) replaces the isinstance cascade.
+_EXPR_DISPATCH: Dict[type, Callable[[Any, Environment, State], EVal]] = {
+    str: _eval_identifier,
+    ComplexLiteral: _eval_complex_literal,
+    IntLiteral: _eval_int_literal,
+    OpCall: _eval_op_call,
+    FunCall: _eval_fun_call,
+}
+
+def evaluate_expr(expr: Expr, env: Environment, state: State) -> EVal:
+    """Evaluates an expression in the given environment and state."""
+    handler = _EXPR_DISPATCH.get(type(expr))
+    if handler is None:
+        raise TypeError(f"Unknown expression type: {expr}")
+    return handler(expr, env, state)
 
 
 from parser import ComplexDecl, Assign, IfCmd, WhileCmd
@@ -388,8 +390,6 @@ def execute_command(cmd: Command, env: Environment, state: State) -> tuple[Envir
         case IfCmd(cond, then_branch, else_branch):
             cond_val = evaluate_expr(cond, env, state)
 
-            print(cond_val)
-
             if not isinstance(cond_val, int):
                 raise ValueError("Condition expression does not evaluate to an integer")
             
@@ -397,19 +397,18 @@ def execute_command(cmd: Command, env: Environment, state: State) -> tuple[Envir
 
             if cond_val:
                 _, state1 = execute_command_seq(then_branch, env, state)
-                #Restore next_loc after block
-                state2 = State(store = state1.store, next_loc = saved_next_loc, vertices_order = state1.vertices_order, new_vertex_id = state1.new_vertex_id)
-                return env, state2
             else:
                 _, state1 = execute_command_seq(else_branch, env, state)
-                state2 = State(store = state1.store, next_loc = saved_next_loc, vertices_order = state1.vertices_order, new_vertex_id = state1.new_vertex_id)
-                return env, state2
+
+            #Restore next_loc after block
+            state1.next_loc = saved_next_loc
+            return env, state1
 
         case WhileCmd(cond, body):
             current_state = state
 
-            max_iterations = range(10000000)  # Prevent infinite loops
-            for _ in max_iterations:  
+            iterations = 0
+            while True:
                 cond_val = evaluate_expr(cond, env, current_state)
 
                 if not isinstance(cond_val, int):
@@ -420,7 +419,10 @@ def execute_command(cmd: Command, env: Environment, state: State) -> tuple[Envir
 
                 _, current_state = execute_command_seq(body, env, current_state)
 
-            raise RuntimeError("Maximum iterations reached in while loop, possible infinite loop")
+                # Prevent infinite loops
+                iterations += 1
+                if iterations >= current_state.max_iterations:
+                    raise RuntimeError("Maximum iterations reached in while loop, possible infinite loop")
 
         case FunctionDecl(name, params, body):
             closure = Closure(function=cmd, env=env)
@@ -1,4 +1,5 @@
-import numpy as numpy
+import numpy as np
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 from parser import parse_ast
@@ -6,78 +7,204 @@ from complex import Complex, Simplex
 
 def skeleton_map(complex: Complex) -> Dict[int, List[Simplex]]:
     """Returns a mapping from dimension k to the k-skeleton of the complex."""
-    skeleton: Dict[int, List[Simplex]] = {}
-    simplices = complex.simplices
-
-    for simplex in simplices:
-        dim = len(simplex) - 1
-        if dim not in skeleton:
-            skeleton[dim] = []
-        skeleton[dim].append(simplex)
-
-    return skeleton
+    return complex.skeleton
 
 def k_simplices(complex: Complex, k: int) -> List[Simplex]:
     """Return the list of k-simplices in the complex."""
-    skeleton = skeleton_map(complex)
-    return skeleton.get(k, [])
+    return complex.skeleton.get(k, [])
 
-def ordered(simplex: Simplex, complex: Complex) -> Tuple[str, ...]:
-    order = complex.vertex_order
-    return tuple(sorted(simplex, key = lambda v: order[v]))
+@lru_cache(maxsize=1024)
+def _row_index(complex: Complex, k: int) -> Dict[Simplex, int]:
+    """Simplex -> row position among the k-simplices, memoized.
 
+    boundary_matrix and boundary_rows for d_k and d_{k+1} both index rows
+    by the same k-simplex list; building the table once per (complex, k)
+    shares it between them.
+    """
+    return {s: i for i, s in enumerate(k_simplices(complex, k))}
+
+def ordered(simplex: Simplex, complex: Complex) -> Tuple[str, ...]:
+    return complex.ordered_simplices[simplex]
 
-import numpy as np
 
 def boundary_matrix(complex: Complex, k: int) -> np.ndarray:
-    """Constructs the boundary matrix d_k: C_k -> C_{k-1} over F_2."""
+    """Constructs the boundary matrix d_k: C_k -> C_{k-1} over F_2, bit-packed.
+
+    Row r holds the F_2 entries of the r-th (k-1)-simplex as 64-bit words:
+    column j lives in bit j & 63 of word j >> 6. Packing 64 entries per
+    word cuts the memory footprint 64x versus one int per entry and lets
+    the rank computation eliminate whole rows with word-wide XORs.
+    """
     k_simp = k_simplices(complex, k)
     k1_simp = k_simplices(complex, k - 1)
 
-    row_index = {s: i for i, s in enumerate(k1_simp)}
-    col_index = {s: j for j, s in enumerate(k_simp)}
+    row_index = _row_index(complex, k - 1)
 
-    M = np.zeros((len(k1_simp), len(k_simp)), dtype=int)
+    M = np.zeros((len(k1_simp), (len(k_simp) + 63) >> 6), dtype=np.uint64)
 
-    for simplex in k_simp:
+    for j, simplex in enumerate(k_simp):
         verts = ordered(simplex, complex)
-        j = col_index[simplex]
+        word = j >> 6
+        bit = np.uint64(1) << np.uint64(j & 63)
 
         for i in range(len(verts)):
             face = frozenset(verts[:i] + verts[i + 1:])
-            r = row_index[face]
-            M[r, j] ^= 1
+            M[row_index[face], word] ^= bit
 
     return M
 
-def rank_mod2(M: np.ndarray) -> int:
-    """Computes the rank of matrix M over F_2 using Gaussian elimination."""
-    M = M.copy() % 2
-    rows, cols = M.shape
+def rank_mod2(M: np.ndarray, cols: int, max_rank: int | None = None) -> int:
+    """Computes the rank of a bit-packed F_2 matrix using Gaussian elimination.
+
+    M is the packed form built by boundary_matrix; cols is the number of
+    logical columns. Eliminating a pivot XORs the whole packed pivot row
+    into every other row with that column bit set, one vectorized pass.
+    If max_rank is given it is a known upper bound on the rank, and
+    elimination stops as soon as that many pivots are found.
+    """
+    M = M.copy()
+    rows = M.shape[0]
+    limit = rows if max_rank is None else min(rows, max_rank)
     rank = 0
 
     for col in range(cols):
-        pivot = None
-        for r in range(rank, rows):
-            if M[r, col] == 1:
-                pivot = r
-                break
+        if rank == limit:
+            break
 
-        if pivot is None:
+        word = col >> 6
+        bit = np.uint64(1) << np.uint64(col & 63)
+
+        nz = np.flatnonzero(M[rank:, word] & bit)
+        if not len(nz):
             continue
+        pivot = rank + int(nz[0])
 
-        M[[rank, pivot]] = M[[pivot, rank]]
+        if pivot != rank:
+            M[[rank, pivot]] = M[[pivot, rank]]
 
-        for r in range(rows):
-            if r != rank and M[r, col] == 1:
-                M[r] ^= M[rank]
+        mask = (M[:, word] & bit).astype(bool)
+        mask[rank] = False
+        M[mask] ^= M[rank]
 
         rank += 1
 
     return rank
 
+def boundary_rows(complex: Complex, k: int) -> List[set]:
+    """Constructs d_k as sparse rows: one set of column indices per (k-1)-simplex.
+
+    Boundary matrices have exactly k+1 ones per column, so for large
+    complexes the packed dense array is mostly zeros; this form stores only
+    the nonzeros.
+    """
+    k_simp = k_simplices(complex, k)
+    k1_simp = k_simplices(complex, k - 1)
+
+    row_index = _row_index(complex, k - 1)
+    rows: List[set] = [set() for _ in k1_simp]
+
+    for j, simplex in enumerate(k_simp):
+        verts = ordered(simplex, complex)
+        for i in range(len(verts)):
+            face = frozenset(verts[:i] + verts[i + 1:])
+            rows[row_index[face]].add(j)
+
+    return rows
+
+import heapq
+
+def rank_mod2_sparse(rows: List[set], max_rank: int | None = None) -> int:
+    """Computes the rank of a sparse F_2 matrix given as sets of column indices.
+
+    Elimination always pivots on the sparsest remaining row, and within it
+    on the column present in the fewest other rows (Markowitz-style), which
+    keeps fill-in low. Row updates are set symmetric differences touching
+    only nonzeros, so memory stays proportional to the nonzero count.
+    If max_rank is given it is a known upper bound on the rank, and
+    elimination stops as soon as that many pivots are found.
+    """
+    rows = [set(r) for r in rows]
+    col_rows: Dict[int, set] = {}
+    for i, row in enumerate(rows):
+        for j in row:
+            col_rows.setdefault(j, set()).add(i)
+
+    active = {i for i, row in enumerate(rows) if row}
+    # lazy heap of (row weight, row); stale entries are skipped on pop
+    heap = [(len(rows[i]), i) for i in active]
+    heapq.heapify(heap)
+
+    rank = 0
+    while heap:
+        if rank == max_rank:
+            break
+        weight, p = heapq.heappop(heap)
+        if p not in active or len(rows[p]) != weight:
+            continue
+
+        prow = rows[p]
+        c = min(prow, key=lambda j: len(col_rows[j]))
+
+        active.remove(p)
+        rank += 1
+        for j in prow:
+            col_rows[j].discard(p)
+
+        for i in list(col_rows[c]):
+            if i not in active:
+                continue
+            row = rows[i]
+            for j in prow:
+                if j in row:
+                    row.remove(j)
+                    col_rows[j].discard(i)
+                else:
+                    row.add(j)
+                    col_rows[j].add(i)
+            if row:
+                heapq.heappush(heap, (len(row), i))
+            else:
+                active.remove(i)
+
+    return rank
+
+# Above this many packed uint64 words (~32 MB) the dense bit-packed matrix
+# stops paying for itself; fall back to the sparse representation.
+_PACKED_WORD_LIMIT = 1 << 22
+
+@lru_cache(maxsize=1024)
+def _rank_boundary(complex: Complex, k: int) -> int:
+    """Rank of d_k, choosing the packed or sparse path by matrix size.
+
+    Memoized so that the ranks shared between adjacent homology degrees
+    (H_k and H_{k+1} both need rank d_{k+1}) are computed once. Ranks are
+    resolved from the top dimension downward: since d_k d_{k+1} = 0, the
+    image of d_{k+1} lies in the kernel of d_k, so
+    rank d_k <= dim C_k - rank d_{k+1}; that bound is passed to the
+    elimination, which stops early once it is reached (the clearing idea
+    of Chen-Kerber, adapted to a rank computation).
+    """
+    rows = len(k_simplices(complex, k - 1))
+    cols = len(k_simplices(complex, k))
+
+    if rows == 0 or cols == 0:
+        return 0
+
+    max_rank = cols - _rank_boundary(complex, k + 1) if k < complex.dimension else None
+
+    if rows * ((cols + 63) >> 6) > _PACKED_WORD_LIMIT:
+        return rank_mod2_sparse(boundary_rows(complex, k), max_rank)
+
+    return rank_mod2(boundary_matrix(complex, k), cols, max_rank)
+
+@lru_cache(maxsize=1024)
 def homology_rank(complex: Complex, k: int) -> int:
-    """Computes the rank of the k-th homology group H_k(X) over F_2."""
+    """Computes the rank of the k-th homology group H_k(X) over F_2.
+
+    Memoized: Complex is immutable and hashable, and the same complex is
+    typically queried repeatedly (betti inside loops, compute_homology per
+    web request), so each (complex, k) pair is reduced only once.
+    """
     if k < 0 or complex.dimension < k:
         return 0
     
@@ -86,14 +213,12 @@ def homology_rank(complex: Complex, k: int) -> int:
     if k == 0:
         rank_dk = 0   # d_0 = 0
     else:
-        d_k = boundary_matrix(complex, k)
-        rank_dk = rank_mod2(d_k) if d_k.size > 0 else 0
+        rank_dk = _rank_boundary(complex, k)
 
     if k + 1 > complex.dimension:
         rank_dk1 = 0
     else:
-        d_k1 = boundary_matrix(complex, k + 1)
-        rank_dk1 = rank_mod2(d_k1) if d_k1.size > 0 else 0
+        rank_dk1 = _rank_boundary(complex, k + 1)
 
     dimKer_dk = dimC_k - rank_dk
 
@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Dict, List
+
+type VertexName = str
+
+# Dense integer ids for vertex names, shared by every Complex in the process.
+# The canonicalization loops in complex.py work on integer bitmasks keyed by
+# these ids: degeneracy checks become popcounts and deduplication hashes
+# small ints instead of frozensets of strings. Python ints are arbitrary
+# width, so the masks are not limited to 64 vertices. Names only reappear at
+# the boundary, when a mask is converted back into a set of vertex names.
+_ids: Dict[VertexName, int] = {}
+_names: List[VertexName] = []
+
+def vertex_id(name: VertexName) -> int:
+    """Returns the dense id of a vertex name, interning it on first contact."""
+    vid = _ids.get(name)
+    if vid is None:
+        vid = len(_names)
+        _ids[name] = vid
+        _names.append(name)
+    return vid
+
+def vertex_name(vid: int) -> VertexName:
+    """Returns the vertex name interned under the given id."""
+    return _names[vid]
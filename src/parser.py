@@ -1,5 +1,8 @@
-from lark import Lark, Token, Tree
+import sys
+
+from lark import Lark, Token, Transformer, v_args
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, FrozenSet
 
 constructive_operations = {"union", "glue", "join", "dimension", "num_simplices", "num_vertices", "pick_vert"}
@@ -7,10 +10,9 @@ observational_operations = {"dim", "num_vert" }
 other_operations = {"add", "sub", "mul", "not", "and", "or", "greater", "less", "leq", "geq", "betti"}
 
 defined_operations = constructive_operations | observational_operations | other_operations
-op_regex = "|".join(defined_operations)
 
 # Parser grammar
-grammar = fr"""
+grammar = r"""
     program: command*
 
     ?command: complex_decl
@@ -24,33 +26,30 @@ grammar = fr"""
     assign: IDENT "<-" expr
     vertex_decl: "vertex" IDENT
 
-    if_cmd: "if" expr "then" command* ["else" command*] "endif"
+    if_cmd: "if" expr "then" command* else_clause? "endif"
+    else_clause: "else" command*
     while_cmd: "while" expr "do" command* "endwhile"
 
     function_decl: "function" IDENT "(" param_list? ")" "=" expr
 
-    ?expr: op_call
-        | function_call
+    ?expr: call
         | IDENT
         | vertices_list
         | NUMBER
         | "(" expr ")"
 
-    op_call: OP "(" arg_list? ")" ["mapping" mapping_block]
+    call: IDENT "(" arg_list? ")" mapping_block?
 
-    function_call: IDENT "(" arg_list? ")"
-    
     vertices_list: "[" id_list "]"
     id_list: IDENT ("," IDENT)*
 
     param_list: IDENT ("," IDENT)*
     arg_list: expr ("," expr)*
 
-    mapping_block: mapping_list
+    mapping_block: "mapping" mapping_list
     mapping_list: mapping_pair ("," mapping_pair)*
     mapping_pair: IDENT "->" IDENT
             
-    OP: /{op_regex}/
     IDENT: /[A-Za-z_][A-Za-z0-9_]*/
     NUMBER: /[0-9]+/
 
@@ -60,28 +59,26 @@ grammar = fr"""
     %ignore WS
 """
 
-parser = Lark(grammar, start="program")
-
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Union
 
 type Ref = str
 
-@dataclass
+@dataclass(slots=True)
 class ComplexLiteral:
     vertices: List[Ref]
 
-@dataclass
+@dataclass(slots=True)
 class OpCall:
     op: str
     args: List["Expr"]
     mapping: Dict[str, str] | None
 
-@dataclass
+@dataclass(slots=True)
 class IntLiteral:
     value: int
 
-@dataclass
+@dataclass(slots=True)
 class FunCall:
     name: str
     args: List["Expr"]
@@ -90,38 +87,38 @@ Expr = Ref | ComplexLiteral | OpCall | IntLiteral | FunCall
 
 # == Commands == #
 
-@dataclass
+@dataclass(slots=True)
 class ComplexDecl:
     name: str
     expr: Expr
 
-@dataclass
+@dataclass(slots=True)
 class Assign:
     name: str
     expr: Expr
 
-@dataclass
+@dataclass(slots=True)
 class VertexDecl:
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class IfCmd:
     cond: Expr
     then_branch: List["Command"]
     else_branch: List["Command"]
 
-@dataclass
+@dataclass(slots=True)
 class WhileCmd:
     cond: Expr
     body: List["Command"]
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDecl:
     name: str
     params: List[str]
     body: Expr
 
-@dataclass
+@dataclass(slots=True)
 class ReturnCmd:
     expr: Expr
 
@@ -130,112 +127,118 @@ type Command = ComplexDecl | Assign | VertexDecl | IfCmd | WhileCmd | FunctionDe
 type Program = List[Command]
 
 
-def transform_expr_tree(tree) -> Expr:
-    match tree:
-        case Tree("vertices_list", [id_list]):
-            return ComplexLiteral(
-                [tok.value for tok in id_list.children]
-            )
-
-        case Tree("op_call", children):
-            op = children[0].value
-
-            args = []
-            mapping = None
+@v_args(inline=True)
+class AstBuilder(Transformer):
+    """Builds AST nodes bottom-up while the LALR parser reduces rules.
 
-            if len(children) >= 2 and isinstance(children[1], Tree) and children[1].data == "arg_list":
-                args = [transform_expr_tree(a) for a in children[1].children]
-
-            if children and isinstance(children[-1], Tree) and children[-1].data == "mapping_block":
-                mapping = {
-                    p.children[0].value: p.children[1].value
-                    for p in children[-1].children[0].children
-                }
-
-            return OpCall(op, args, mapping)
+    Attached to the parser via the transformer argument, so no intermediate
+    Tree is materialized: each callback receives already-transformed
+    children and returns the corresponding dataclass.
+    """
 
-        case Tree("function_call", [Token("IDENT", name), *rest]):
-            if rest:
-                arg_list_tree = rest[0]
-                args_exprs = [transform_expr_tree(a) for a in arg_list_tree.children]
+    def IDENT(self, token: Token) -> Ref:
+        # interned: vertex and variable names are hashed and compared all
+        # over the evaluator and the complex operations, and Token.value is
+        # a fresh str subclass per occurrence
+        return sys.intern(str(token))
+
+    def NUMBER(self, token: Token) -> IntLiteral:
+        return IntLiteral(int(token))
+
+    def program(self, *commands) -> Program:
+        return list(commands)
+
+    def complex_decl(self, name: Ref, expr: Expr) -> ComplexDecl:
+        return ComplexDecl(name, expr)
+
+    def assign(self, name: Ref, expr: Expr) -> Assign:
+        return Assign(name, expr)
+
+    def vertex_decl(self, name: Ref) -> VertexDecl:
+        return VertexDecl(name)
+
+    def if_cmd(self, cond: Expr, *rest) -> IfCmd:
+        # commands are dataclass instances, so a trailing list can only be
+        # the else_clause
+        if rest and isinstance(rest[-1], list):
+            return IfCmd(cond, list(rest[:-1]), rest[-1])
+        return IfCmd(cond, list(rest), [])
+
+    def else_clause(self, *commands) -> List["Command"]:
+        return list(commands)
+
+    def while_cmd(self, cond: Expr, *body) -> WhileCmd:
+        return WhileCmd(cond, list(body))
+
+    def function_decl(self, name: Ref, *rest) -> FunctionDecl:
+        if len(rest) == 2:
+            params, body = rest
+        else:
+            params, body = [], rest[0]
+        return FunctionDecl(name, params, body)
+
+    def return_cmd(self, expr: Expr) -> ReturnCmd:
+        return ReturnCmd(expr)
+
+    def call(self, name: Ref, *rest) -> OpCall | FunCall:
+        # one grammar rule covers built-in operations and user functions;
+        # the name decides which node to build
+        args: List[Expr] = []
+        mapping: Dict[str, str] | None = None
+        for r in rest:
+            if isinstance(r, dict):
+                mapping = r
             else:
-                args_exprs = []
-            return FunCall(name, args_exprs)
-
+                args = r
+        if name in defined_operations:
+            return OpCall(name, args, mapping)
+        if mapping is not None:
+            raise ValueError(f"'mapping' is only valid on built-in operations, not '{name}'")
+        return FunCall(name, args)
 
-        case Token("IDENT", name):
-            return name
+    def vertices_list(self, ids: List[Ref]) -> ComplexLiteral:
+        return ComplexLiteral(ids)
 
-        case Token("NUMBER", value):
-            return IntLiteral(int(value))
+    def id_list(self, *ids) -> List[Ref]:
+        return list(ids)
 
-        case Tree("expr", [sub]):
-            return transform_expr_tree(sub)
+    def param_list(self, *params) -> List[str]:
+        return list(params)
 
-        case _:
-            raise ValueError(f"Unexpected expression tree: {tree}")
+    def arg_list(self, *exprs) -> List[Expr]:
+        return list(exprs)
 
-        
-def transform_command_tree(tree) -> Command:
-    match tree:
-        case Tree("complex_decl", [Token("IDENT", name), expr]):
-            return ComplexDecl(name, transform_expr_tree(expr))
+    def mapping_block(self, pairs: Dict[str, str]) -> Dict[str, str]:
+        return pairs
 
-        case Tree("assign", [Token("IDENT", name), expr]):
-            return Assign(name, transform_expr_tree(expr))
-        
-        case Tree("vertex_decl", [Token("IDENT", name)]):
-            return VertexDecl(name)
+    def mapping_list(self, *pairs) -> Dict[str, str]:
+        return dict(pairs)
 
-        case Tree("if_cmd", children):
-            cond = transform_expr_tree(children[0])
-            then_cmds = []
-            else_cmds = []
+    def mapping_pair(self, a: Ref, b: Ref) -> tuple:
+        return (a, b)
 
-            i = 1
-            while i < len(children) and children[i].data == "command":
-                then_cmds.append(transform_command_tree(children[i]))
-                i += 1
 
-            while i < len(children):
-                else_cmds.append(transform_command_tree(children[i]))
-                i += 1
-
-            return IfCmd(cond, then_cmds, else_cmds)
-
-        case Tree("while_cmd", children):
-            cond = transform_expr_tree(children[0])
-            body = [transform_command_tree(c) for c in children[1:]]
-            return WhileCmd(cond, body)
-
-        case Tree("function_decl", children):
-            name = children[0].value
-            params = []
-            body = None
-
-            if isinstance(children[1], Tree) and children[1].data == "param_list":
-                params = [tok.value for tok in children[1].children]
-                body = transform_expr_tree(children[2])
-            else:
-                body = transform_expr_tree(children[1])
-
-            return FunctionDecl(name, params, body)
-
-        case Tree("return_cmd", [expr]):
-            return ReturnCmd(transform_expr_tree(expr))
-
-        case _:
-            raise ValueError(f"Unexpected command tree: {tree}")
+parser = Lark(
+    grammar,
+    start="program",
+    parser="lalr",
+    transformer=AstBuilder(),
+    cache=True,
+    propagate_positions=False,
+    maybe_placeholders=False,
+)
 
 
+@lru_cache(maxsize=256)
 def parse_ast(source_code: str) -> Program:
-    parser = Lark(grammar, start="program")
-    tree = parser.parse(source_code)
+    """Parses a program into its AST, memoized by source text.
 
-    return [
-        transform_command_tree(cmd)
-        for cmd in tree.children
-    ]
+    The web server re-parses on every request and users typically
+    resubmit the same or barely-edited programs; identical sources hit
+    the cache. Callers treat the AST as read-only, so sharing nodes
+    between calls is safe.
+    """
+    return parser.parse(source_code)
 
 if __name__ == "__main__":
     sample_code = """
@@ -245,7 +248,7 @@ if __name__ == "__main__":
     complex M = union(K, L)
 
     if dim(M) then
-        M <- glue(M, K) mapping { b->b }
+        M <- glue(M, K) mapping b->b
     else
     
     endif
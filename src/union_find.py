@@ -1,67 +1,102 @@
 from __future__ import annotations
-from typing import Dict, Generic, Set, TypeVar
+from typing import Dict, Generic, List, Set, TypeVar
 
 T = TypeVar("T")
 
 class UnionFind(Generic[T]):
+    """Array-backed union-find with union by rank and path halving.
+
+    Elements are interned to dense integer ids on first contact. Parent
+    pointers live in a plain list indexed by id and ranks in a bytearray
+    (rank <= log2 n always fits in a byte), so the hot find loop is pure
+    list indexing with no dict probes and no recursion.
+    """
+
     def __init__(self):
-        self.parent: Dict[T, T] = {}
-        self.rank: Dict[T, int] = {}
+        self._ids: Dict[T, int] = {}
+        self._elems: List[T] = []
+        self._parent: List[int] = []
+        self._rank = bytearray()
+        self._classes: Dict[T, Set[T]] | None = None
+
+    def _id(self, x: T) -> int:
+        """Returns the dense id of x, interning it on first contact."""
+        i = self._ids.get(x)
+        if i is None:
+            i = len(self._elems)
+            self._ids[x] = i
+            self._elems.append(x)
+            self._parent.append(i)
+            self._rank.append(0)
+            self._classes = None
+        return i
 
     def add(self, x: T):
-        if x not in self.parent:
-            self.parent[x] = x
-            self.rank[x] = 0
+        self._id(x)
+
+    def _find_id(self, i: int) -> int:
+        """Root id of element id i, halving the path along the way."""
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
 
     def find(self, x: T) -> T:
-        if x not in self.parent:
-            self.add(x)
-        if self.parent[x] != x:
-            self.parent[x] = self.find(self.parent[x])
-        return self.parent[x]
-    
+        return self._elems[self._find_id(self._id(x))]
+
     def union(self, x: T, y: T) -> T:
-        rx = self.find(x)
-        ry = self.find(y)
-
-        if rx == ry:
-            return rx
-        
-        if self.rank[rx] < self.rank[ry]:
-            self.parent[rx] = ry
-            return ry
-        elif self.rank[rx] > self.rank[ry]:
-            self.parent[ry] = rx
-            return rx
-        else:
-            self.parent[ry] = rx
-            self.rank[rx] += 1
-            return rx
-    
+        ri = self._find_id(self._id(x))
+        rj = self._find_id(self._id(y))
+
+        if ri == rj:
+            return self._elems[ri]
+
+        rank = self._rank
+        if rank[ri] < rank[rj]:
+            ri, rj = rj, ri
+        self._parent[rj] = ri
+        if rank[ri] == rank[rj]:
+            rank[ri] += 1
+        self._classes = None
+        return self._elems[ri]
+
+    def flatten(self):
+        """Fully compresses the structure in one pass.
+
+        After the bulk-union phase of an operation the partition no longer
+        changes; pointing every parent directly at its root makes each
+        subsequent find a single list lookup with no path walking.
+        """
+        parent = self._parent
+        for i in range(len(parent)):
+            parent[i] = self._find_id(i)
+
     def get_classes(self) -> Dict[T, Set[T]]:
-        out: Dict[T, Set[T]] = {}
-        for x in self.parent:
-            rep = self.find(x)
-            out.setdefault(rep, set()).add(x)
-        return out
-    
+        # Cached until the next add/union changes the partition; callers
+        # such as glue query classes repeatedly between mutations.
+        if self._classes is None:
+            out: Dict[T, Set[T]] = {}
+            elems = self._elems
+            for i, x in enumerate(elems):
+                rep = elems[self._find_id(i)]
+                out.setdefault(rep, set()).add(x)
+            self._classes = out
+        return self._classes
+
     def get_nodes(self) -> Set[T]:
-        return set(self.parent.keys())
+        return set(self._ids)
 
     def merge(self, other: UnionFind) -> "UnionFind":
         new_uf = UnionFind()
-        # add all nodes
-        for v in self.get_nodes() | other.get_nodes():
-            new_uf.add(v)
-        # union all equivalences from self
-        for cls in self.get_classes().values():
-            nodes = list(cls)
-            for i in range(1, len(nodes)):
-                new_uf.union(nodes[0], nodes[i])
-        # union all equivalences from other
-        for cls in other.get_classes().values():
-            nodes = list(cls)
-            for i in range(1, len(nodes)):
-                new_uf.union(nodes[0], nodes[i])
+        # copy self wholesale: ids, parents and ranks keep their structure
+        new_uf._ids = dict(self._ids)
+        new_uf._elems = list(self._elems)
+        new_uf._parent = list(self._parent)
+        new_uf._rank = bytearray(self._rank)
+        # fold in other's elements, replaying each parent link once
+        other_elems = other._elems
+        for i, x in enumerate(other_elems):
+            new_uf.add(x)
+            new_uf.union(x, other_elems[other._parent[i]])
         return new_uf
-
@@ -12,6 +12,9 @@ app = FastAPI()
 
 class ProgramInput(BaseModel):
     program: str
+    # when set, only these complexes are serialized (and their homology
+    # computed); the program itself always runs in full
+    targets: list[str] | None = None
 
 @app.post("/run_program")
 def run_program(data: ProgramInput):
@@ -26,6 +29,9 @@ def run_program(data: ProgramInput):
             if not isinstance(dval, Loc):
                 continue
 
+            if data.targets is not None and name not in data.targets:
+                continue
+
             try:
                 value = state.store[dval.addr]
 
@@ -38,9 +44,7 @@ def run_program(data: ProgramInput):
                         "classes": {
                             k: list(v) for k, v in value.classes.items()
                         },
-                        "homology": {
-                            k: r for k, r in compute_homology(value).items()
-                        }
+                        "homology": compute_homology(value)
                     }
     
             except KeyError: